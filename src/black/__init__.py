@@ -7,7 +7,6 @@ import tokenize
 import traceback
 from collections.abc import (
     Collection,
-    Generator,
     Iterator,
     MutableMapping,
     Sequence,
@@ -17,10 +16,11 @@ from contextlib import contextmanager
 from dataclasses import replace
 from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
 from json.decoder import JSONDecodeError
 from pathlib import Path
 from re import Pattern
-from typing import Any, Optional, Union
+from typing import Any, Final, Optional, Union
 
 import click
 from click.core import ParameterSource
@@ -59,7 +59,7 @@ from black.handle_ipynb_magics import (
     validate_cell,
 )
 from black.linegen import LN, LineGenerator, transform_line
-from black.lines import EmptyLineTracker, LinesBlock
+from black.lines import EmptyLineTracker, Line, LinesBlock
 from black.mode import FUTURE_FLAG_TO_FEATURE, VERSION_TO_FEATURES, Feature
 from black.mode import Mode as Mode  # re-exported
 from black.mode import Preview, TargetVersion, supports_feature
@@ -213,10 +213,12 @@ def enable_unstable_feature_callback(
     return [Preview[val] for val in v]
 
 
+@lru_cache(maxsize=64)
 def re_compile_maybe_verbose(regex: str) -> Pattern[str]:
     """Compile a regular expression string in `regex`.
 
-    If it contains newlines, use verbose mode.
+    If it contains newlines, use verbose mode. Results are cached since Black
+    may be invoked many times in the same process.
     """
     if "\n" in regex:
         regex = "(?x)" + regex
@@ -224,6 +226,11 @@ def re_compile_maybe_verbose(regex: str) -> Pattern[str]:
     return compiled
 
 
+# Used when no --exclude is given. The default --include is compiled through the
+# cache above by validate_regex(), like any user-provided value.
+_DEFAULT_EXCLUDE_RE: Final = re_compile_maybe_verbose(DEFAULT_EXCLUDES)
+
+
 def validate_regex(
     ctx: click.Context,
     param: click.Parameter,
@@ -742,7 +749,7 @@ def get_sources(
 
     assert root.is_absolute(), f"INTERNAL ERROR: `root` must be absolute but is {root}"
     using_default_exclude = exclude is None
-    exclude = re_compile_maybe_verbose(DEFAULT_EXCLUDES) if exclude is None else exclude
+    exclude = _DEFAULT_EXCLUDE_RE if exclude is None else exclude
     gitignore: Optional[dict[Path, PathSpec]] = None
     root_gitignore = get_gitignore(root)
 
@@ -761,15 +768,17 @@ def get_sources(
                     out(f'Skipping invalid source: "{path}"', fg="red")
                 continue
 
-            root_relative_path = best_effort_relative_path(path, root).as_posix()
-            root_relative_path = "/" + root_relative_path
-
-            # Hard-exclude any files that matches the `--force-exclude` regex.
-            if path_is_excluded(root_relative_path, force_exclude):
-                report.path_ignored(
-                    path, "matches the --force-exclude regular expression"
-                )
-                continue
+            # Hard-exclude any files that matches the `--force-exclude` regex. The
+            # root-relative path is only needed for that, so skip building it for
+            # every source when the option isn't used.
+            if force_exclude is not None:
+                root_relative_path = best_effort_relative_path(path, root).as_posix()
+                root_relative_path = "/" + root_relative_path
+                if path_is_excluded(root_relative_path, force_exclude):
+                    report.path_ignored(
+                        path, "matches the --force-exclude regular expression"
+                    )
+                    continue
 
             if is_stdin:
                 path = Path(f"{STDIN_PLACEHOLDER}{str(path)}")
@@ -922,7 +931,7 @@ def format_file_in_place(
     fast: bool,
     mode: Mode,
     write_back: WriteBack = WriteBack.NO,
-    lock: Any = None,  # multiprocessing.Manager().Lock() is some crazy proxy
+    lock: Any = None,  # multiprocessing.Lock() or similar
     *,
     lines: Collection[tuple[int, int]] = (),
 ) -> bool:
@@ -932,17 +941,20 @@ def format_file_in_place(
     code to the file.
     `mode` and `fast` options are passed to :func:`format_file_contents`.
     """
-    if src.suffix == ".pyi":
+    if src.suffix == ".pyi" and not mode.is_pyi:
         mode = replace(mode, is_pyi=True)
-    elif src.suffix == ".ipynb":
+    elif src.suffix == ".ipynb" and not mode.is_ipynb:
         mode = replace(mode, is_ipynb=True)
 
-    then = datetime.fromtimestamp(src.stat().st_mtime, timezone.utc)
     header = b""
     with open(src, "rb") as buf:
-        if mode.skip_source_first_line:
-            header = buf.readline()
-        src_contents, encoding, newline = decode_bytes(buf.read())
+        # Read the whole file in one go and split off the header in memory
+        # rather than going through the buffered reader line by line.
+        data = buf.read()
+    if mode.skip_source_first_line:
+        header_end = data.find(b"\n") + 1 or len(data)
+        header, data = data[:header_end], data[header_end:]
+    src_contents, encoding, newline = decode_bytes(data)
     try:
         dst_contents = format_file_contents(
             src_contents, fast=fast, mode=mode, lines=lines
@@ -960,6 +972,9 @@ def format_file_in_place(
         with open(src, "w", encoding=encoding, newline=newline) as f:
             f.write(dst_contents)
     elif write_back in (WriteBack.DIFF, WriteBack.COLOR_DIFF):
+        # The modification time is only needed for the diff header, so avoid
+        # the extra stat() call when writing back or checking.
+        then = datetime.fromtimestamp(src.stat().st_mtime, timezone.utc)
         now = datetime.now(timezone.utc)
         src_name = f"{src}\t{then}"
         dst_name = f"{src}\t{now}"
@@ -971,16 +986,26 @@ def format_file_in_place(
         if write_back == WriteBack.COLOR_DIFF:
             diff_contents = color_diff(diff_contents)
 
-        with lock or nullcontext():
-            f = io.TextIOWrapper(
-                sys.stdout.buffer,
-                encoding=encoding,
-                newline=newline,
-                write_through=True,
-            )
-            f = wrap_stream_for_windows(f)
-            f.write(diff_contents)
-            f.detach()
+        if sys.platform == "win32":
+            with lock or nullcontext():
+                f = io.TextIOWrapper(
+                    sys.stdout.buffer,
+                    encoding=encoding,
+                    newline=newline,
+                    write_through=True,
+                )
+                f = wrap_stream_for_windows(f)
+                f.write(diff_contents)
+                f.detach()
+        else:
+            # No need to set up a text wrapper around stdout for every file when
+            # colorama isn't involved; encode outside the lock and write raw bytes.
+            if newline == "\r\n":
+                diff_contents = diff_contents.replace("\n", newline)
+            diff_bytes = diff_contents.encode(encoding)
+            with lock or nullcontext():
+                sys.stdout.buffer.write(diff_bytes)
+                sys.stdout.buffer.flush()
 
     return True
 
@@ -1043,15 +1068,18 @@ def check_stability_and_equivalence(
     *,
     mode: Mode,
     lines: Collection[tuple[int, int]] = (),
+    known_stable: bool = False,
 ) -> None:
     """Perform stability and equivalence checks.
 
     Raise AssertionError if source and destination contents are not
     equivalent, or if a second pass of the formatter would format the
-    content differently.
+    content differently. The latter check is skipped if `known_stable` is True,
+    see :func:`_format_str_with_stability`.
     """
     assert_equivalent(src_contents, dst_contents)
-    assert_stable(src_contents, dst_contents, mode=mode, lines=lines)
+    if not known_stable:
+        assert_stable(src_contents, dst_contents, mode=mode, lines=lines)
 
 
 def format_file_contents(
@@ -1067,17 +1095,24 @@ def format_file_contents(
     valid by calling :func:`assert_equivalent` and :func:`assert_stable` on it.
     `mode` is passed to :func:`format_str`.
     """
+    known_stable = False
     if mode.is_ipynb:
         dst_contents = format_ipynb_string(src_contents, fast=fast, mode=mode)
     else:
-        dst_contents = format_str(src_contents, mode=mode, lines=lines)
+        dst_contents, known_stable = _format_str_with_stability(
+            src_contents, mode=mode, lines=lines
+        )
     if src_contents == dst_contents:
         raise NothingChanged
 
     if not fast and not mode.is_ipynb:
         # Jupyter notebooks will already have been checked above.
         check_stability_and_equivalence(
-            src_contents, dst_contents, mode=mode, lines=lines
+            src_contents,
+            dst_contents,
+            mode=mode,
+            lines=lines,
+            known_stable=known_stable,
         )
     return dst_contents
 
@@ -1106,9 +1141,11 @@ def format_cell(src: str, *, fast: bool, mode: Mode) -> str:
         masked_src, replacements = mask_cell(src_without_trailing_semicolon)
     except SyntaxError:
         raise NothingChanged from None
-    masked_dst = format_str(masked_src, mode=mode)
+    masked_dst, known_stable = _format_str_with_stability(masked_src, mode=mode)
     if not fast:
-        check_stability_and_equivalence(masked_src, masked_dst, mode=mode)
+        check_stability_and_equivalence(
+            masked_src, masked_dst, mode=mode, known_stable=known_stable
+        )
     dst_without_trailing_semicolon = unmask_cell(masked_dst, replacements)
     dst = put_trailing_semicolon_back(
         dst_without_trailing_semicolon, has_trailing_semicolon
@@ -1194,11 +1231,22 @@ def format_str(
     ) -> None:
         hey
 
+    """
+    return _format_str_with_stability(src_contents, mode=mode, lines=lines)[0]
+
+
+def _format_str_with_stability(
+    src_contents: str, *, mode: Mode, lines: Collection[tuple[int, int]] = ()
+) -> tuple[str, bool]:
+    """Like :func:`format_str` but also return whether the result is known stable.
+
+    That is the case when one of the passes below left its input unchanged: as
+    formatting is deterministic, another pass over the result would do the same.
     """
     if lines:
         lines = sanitized_lines(lines, src_contents)
         if not lines:
-            return src_contents  # Nothing to format
+            return src_contents, False  # Nothing to format
     dst_contents = _format_str_once(src_contents, mode=mode, lines=lines)
     # Forced second pass to work around optional trailing commas (becoming
     # forced trailing commas on pass 2) interacting differently with optional
@@ -1206,8 +1254,9 @@ def format_str(
     if src_contents != dst_contents:
         if lines:
             lines = adjusted_lines(lines, src_contents, dst_contents)
-        return _format_str_once(dst_contents, mode=mode, lines=lines)
-    return dst_contents
+        new_dst_contents = _format_str_once(dst_contents, mode=mode, lines=lines)
+        return new_dst_contents, not lines and new_dst_contents == dst_contents
+    return dst_contents, not lines
 
 
 def _format_str_once(
@@ -1251,9 +1300,11 @@ def _format_str_once(
             block.content_lines.append(str(line))
     if dst_blocks:
         dst_blocks[-1].after = 0
+    # Empty lines render the same in every block, so only do that once.
+    empty_line = str(Line(mode=mode))
     dst_contents = []
     for block in dst_blocks:
-        dst_contents.extend(block.all_lines())
+        dst_contents.extend(block.all_lines(empty_line))
     if not dst_contents:
         # Use decode_bytes to retrieve the correct source newline (CRLF or LF),
         # and check if normalized_content has more than one line
@@ -1270,15 +1321,59 @@ def decode_bytes(src: bytes) -> tuple[FileContent, Encoding, NewLine]:
     `newline` is either CRLF or LF but `decoded_contents` is decoded with
     universal newlines (i.e. only contains LF).
     """
-    srcbuf = io.BytesIO(src)
-    encoding, lines = tokenize.detect_encoding(srcbuf.readline)
-    if not lines:
+    first_line_end = src.find(b"\n") + 1 or len(src)
+    head = src[: src.find(b"\n", first_line_end) + 1 or len(src)]
+    if head.isascii() and b"coding" not in head:
+        # Without a BOM or a coding cookie in the first two lines,
+        # tokenize.detect_encoding() settles on UTF-8; skip its line-by-line scan.
+        encoding, first_line = "utf-8", src[:first_line_end]
+    else:
+        encoding, lines = tokenize.detect_encoding(io.BytesIO(src).readline)
+        first_line = lines[0] if lines else b""
+    if not first_line:
         return "", encoding, "\n"
 
-    newline = "\r\n" if b"\r\n" == lines[0][-2:] else "\n"
-    srcbuf.seek(0)
-    with io.TextIOWrapper(srcbuf, encoding) as tiow:
-        return tiow.read(), encoding, newline
+    newline = "\r\n" if b"\r\n" == first_line[-2:] else "\n"
+    # Decode in one go and translate newlines the same way a TextIOWrapper in
+    # universal newlines mode would, without going through its buffered reads.
+    contents = src.decode(encoding)
+    if "\r" in contents:
+        contents = contents.replace("\r\n", "\n").replace("\r", "\n")
+    return contents, encoding, newline
+
+
+# Node types that any of the checks in `get_features_used` looks at. Keep this in
+# sync with them, it lets the walk skip every other node with a single lookup.
+_FEATURE_NODE_TYPES: Final = {
+    token.FSTRING_START,
+    token.RBRACE,
+    token.NUMBER,
+    token.SLASH,
+    token.COLONEQUAL,
+    syms.decorator,
+    syms.typedargslist,
+    syms.arglist,
+    syms.return_stmt,
+    syms.yield_expr,
+    syms.annassign,
+    syms.with_stmt,
+    syms.match_stmt,
+    syms.except_clause,
+    syms.subscriptlist,
+    syms.trailer,
+    syms.tname_star,
+    syms.type_stmt,
+    syms.typeparams,
+    syms.typevartuple,
+    syms.paramspec,
+    syms.typevar,
+}
+_POS_ONLY_PARENTS: Final = {syms.typedargslist, syms.arglist, syms.varargslist}
+_TRAILING_COMMA_PARENTS: Final = {syms.typedargslist, syms.arglist}
+_FLOW_CONTROL_STMTS: Final = {syms.return_stmt, syms.yield_expr}
+_VARIADIC_GENERICS_PARENTS: Final = {syms.subscriptlist, syms.trailer}
+_TYPE_PARAMS_NODES: Final = {syms.type_stmt, syms.typeparams}
+_TYPE_PARAM_NODES: Final = {syms.typevartuple, syms.paramspec, syms.typevar}
 
 
 def get_features_used(  # noqa: C901
@@ -1310,6 +1405,9 @@ def get_features_used(  # noqa: C901
         }
 
     for n in node.pre_order():
+        if n.type not in _FEATURE_NODE_TYPES:
+            continue
+
         if n.type == token.FSTRING_START:
             features.add(Feature.F_STRINGS)
         elif (
@@ -1324,11 +1422,7 @@ def get_features_used(  # noqa: C901
                 features.add(Feature.NUMERIC_UNDERSCORES)
 
         elif n.type == token.SLASH:
-            if n.parent and n.parent.type in {
-                syms.typedargslist,
-                syms.arglist,
-                syms.varargslist,
-            }:
+            if n.parent and n.parent.type in _POS_ONLY_PARENTS:
                 features.add(Feature.POS_ONLY_ARGUMENTS)
 
         elif n.type == token.COLONEQUAL:
@@ -1341,7 +1435,7 @@ def get_features_used(  # noqa: C901
                 features.add(Feature.RELAXED_DECORATORS)
 
         elif (
-            n.type in {syms.typedargslist, syms.arglist}
+            n.type in _TRAILING_COMMA_PARENTS
             and n.children
             and n.children[-1].type == token.COMMA
         ):
@@ -1360,7 +1454,7 @@ def get_features_used(  # noqa: C901
                             features.add(feature)
 
         elif (
-            n.type in {syms.return_stmt, syms.yield_expr}
+            n.type in _FLOW_CONTROL_STMTS
             and len(n.children) >= 2
             and n.children[1].type == syms.testlist_star_expr
             and any(child.type == syms.star_expr for child in n.children[1].children)
@@ -1398,7 +1492,7 @@ def get_features_used(  # noqa: C901
         ):
             features.add(Feature.EXCEPT_STAR)
 
-        elif n.type in {syms.subscriptlist, syms.trailer} and any(
+        elif n.type in _VARIADIC_GENERICS_PARENTS and any(
             child.type == syms.star_expr for child in n.children
         ):
             features.add(Feature.VARIADIC_GENERICS)
@@ -1410,13 +1504,10 @@ def get_features_used(  # noqa: C901
         ):
             features.add(Feature.VARIADIC_GENERICS)
 
-        elif n.type in (syms.type_stmt, syms.typeparams):
+        elif n.type in _TYPE_PARAMS_NODES:
             features.add(Feature.TYPE_PARAMS)
 
-        elif (
-            n.type in (syms.typevartuple, syms.paramspec, syms.typevar)
-            and n.children[-2].type == token.EQUAL
-        ):
+        elif n.type in _TYPE_PARAM_NODES and n.children[-2].type == token.EQUAL:
             features.add(Feature.TYPE_PARAM_DEFAULTS)
 
     return features
@@ -1452,20 +1543,24 @@ def get_future_imports(node: Node) -> set[str]:
     """Return a set of __future__ imports in the file."""
     imports: set[str] = set()
 
-    def get_imports_from_children(children: list[LN]) -> Generator[str, None, None]:
-        for child in children:
+    def add_imports_from_children(children: list[LN]) -> None:
+        # Names in parenthesized imports are nested one level deeper, walk them
+        # with a stack instead of recursing.
+        to_visit = list(children)
+        while to_visit:
+            child = to_visit.pop()
             if isinstance(child, Leaf):
                 if child.type == token.NAME:
-                    yield child.value
+                    imports.add(child.value)
 
             elif child.type == syms.import_as_name:
                 orig_name = child.children[0]
                 assert isinstance(orig_name, Leaf), "Invalid syntax parsing imports"
                 assert orig_name.type == token.NAME, "Invalid syntax parsing imports"
-                yield orig_name.value
+                imports.add(orig_name.value)
 
             elif child.type == syms.import_as_names:
-                yield from get_imports_from_children(child.children)
+                to_visit.extend(child.children)
 
             else:
                 raise AssertionError("Invalid syntax parsing imports")
@@ -1491,7 +1586,7 @@ def get_future_imports(node: Node) -> set[str]:
             if not isinstance(module_name, Leaf) or module_name.value != "__future__":
                 break
 
-            imports |= set(get_imports_from_children(first_child.children[3:]))
+            add_imports_from_children(first_child.children[3:])
         else:
             break
 
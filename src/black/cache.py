@@ -121,6 +121,10 @@ class Cache:
         The first contains paths of files that modified on disk or are not in the
         cache. The other contains paths to non-modified files.
         """
+        if not self.file_data:
+            # Nothing is cached yet (first run, new mode or a Black upgrade), so
+            # don't bother resolving and stat'ing every single source.
+            return set(sources), set()
         changed: set[Path] = set()
         done: set[Path] = set()
         for src in sources:
@@ -133,7 +137,7 @@ class Cache:
     def write(self, sources: Iterable[Path]) -> None:
         """Update the cache file data and write a new cache file."""
         self.file_data.update(
-            **{str(src.resolve()): Cache.get_file_data(src) for src in sources}
+            {str(src.resolve()): Cache.get_file_data(src) for src in sources}
         )
         try:
             CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -1,8 +1,7 @@
 import re
 from collections.abc import Collection, Iterator
-from dataclasses import dataclass
 from functools import lru_cache
-from typing import Final, Optional, Union
+from typing import Final, NamedTuple, Optional, Union
 
 from black.mode import Mode, Preview
 from black.nodes import (
@@ -28,10 +27,11 @@ FMT_ON: Final = {"# fmt: on", "# fmt:on", "# yapf: enable"}
 COMMENT_EXCEPTIONS = " !:#'"
 _COMMENT_PREFIX = "# "
 _COMMENT_LIST_SEPARATOR = ";"
+_NON_BREAKING_SPACE = " "
+_NEWLINE_RE: Final = re.compile(r"\r?\n")
 
 
-@dataclass
-class ProtoComment:
+class ProtoComment(NamedTuple):
     """Describes a piece of syntax that is a comment.
 
     It's not a :class:`blib2to3.pytree.Leaf` so that:
@@ -70,14 +70,19 @@ def generate_comments(leaf: LN) -> Iterator[Leaf]:
     are emitted with a fake STANDALONE_COMMENT token identifier.
     """
     total_consumed = 0
-    for pc in list_comments(leaf.prefix, is_endmarker=leaf.type == token.ENDMARKER):
-        total_consumed = pc.consumed
-        prefix = make_simple_prefix(pc.newlines, pc.form_feed)
-        yield Leaf(pc.type, pc.value, prefix=prefix)
+    # Most prefixes don't contain comments, skip the list_comments() cache lookup
+    # (which needs to hash the whole prefix) for those.
+    if "#" in leaf.prefix:
+        for pc in list_comments(leaf.prefix, is_endmarker=leaf.type == token.ENDMARKER):
+            total_consumed = pc.consumed
+            prefix = make_simple_prefix(pc.newlines, pc.form_feed)
+            yield Leaf(pc.type, pc.value, prefix=prefix)
     normalize_trailing_prefix(leaf, total_consumed)
 
 
-@lru_cache(maxsize=4096)
+# The same prefixes are looked up again by linegen after normalize_fmt_off() went
+# over the whole file, so the cache needs to fit all comments of large files.
+@lru_cache(maxsize=16384)
 def list_comments(prefix: str, *, is_endmarker: bool) -> list[ProtoComment]:
     """Return a list of :class:`ProtoComment` objects parsed from the given `prefix`."""
     result: list[ProtoComment] = []
@@ -88,11 +93,10 @@ def list_comments(prefix: str, *, is_endmarker: bool) -> list[ProtoComment]:
     nlines = 0
     ignored_lines = 0
     form_feed = False
-    for index, full_line in enumerate(re.split("\r?\n", prefix)):
+    for index, full_line in enumerate(_NEWLINE_RE.split(prefix)):
         consumed += len(full_line) + 1  # adding the length of the split '\n'
-        match = re.match(r"^(\s*)(\S.*|)$", full_line)
-        assert match
-        whitespace, line = match.groups()
+        line = full_line.lstrip()
+        whitespace = full_line[: len(full_line) - len(line)]
         if not line:
             nlines += 1
             if "\f" in full_line:
@@ -152,12 +156,14 @@ def make_comment(content: str) -> str:
     if not content:
         return "#"
 
+    if content.startswith(_COMMENT_PREFIX):
+        return content  # Already well-formatted, which is the common case
+
     if content[0] == "#":
         content = content[1:]
-    NON_BREAKING_SPACE = " "
     if (
         content
-        and content[0] == NON_BREAKING_SPACE
+        and content[0] == _NON_BREAKING_SPACE
         and not content.lstrip().startswith("type:")
     ):
         content = " " + content[1:]  # Replace NBSP by a simple space
@@ -175,7 +181,7 @@ def normalize_fmt_off(
         try_again = convert_one_fmt_off_pair(node, mode, lines)
 
 
-def convert_one_fmt_off_pair(
+def convert_one_fmt_off_pair(  # noqa: C901
     node: Node, mode: Mode, lines: Collection[tuple[int, int]]
 ) -> bool:
     """Convert content of a single `# fmt: off`/`# fmt: on` into a standalone comment.
@@ -183,6 +189,11 @@ def convert_one_fmt_off_pair(
     Returns True if a pair was converted.
     """
     for leaf in node.leaves():
+        # This walk is repeated after every converted pair, so keep the common case
+        # of a leaf without any comments cheap.
+        if "#" not in leaf.prefix:
+            continue
+
         previous_consumed = 0
         for comment in list_comments(leaf.prefix, is_endmarker=False):
             is_fmt_off = comment.value in FMT_OFF
@@ -212,7 +223,7 @@ def convert_one_fmt_off_pair(
             first = ignored_nodes[0]  # Can be a container node with the `leaf`.
             parent = first.parent
             prefix = first.prefix
-            if comment.value in FMT_OFF:
+            if is_fmt_off:
                 first.prefix = prefix[comment.consumed :]
             if is_fmt_skip:
                 first.prefix = ""
@@ -223,7 +234,7 @@ def convert_one_fmt_off_pair(
                 )
             hidden_value = "".join(str(n) for n in ignored_nodes)
             comment_lineno = leaf.lineno - comment.newlines
-            if comment.value in FMT_OFF:
+            if is_fmt_off:
                 fmt_off_prefix = ""
                 if len(lines) > 0 and not any(
                     line[0] <= comment_lineno <= line[1] for line in lines
@@ -358,8 +369,14 @@ def is_fmt_on(container: LN) -> bool:
     """Determine whether formatting is switched on within a container.
     Determined by whether the last `# fmt:` comment is `on` or `off`.
     """
+    prefix = container.prefix
+    if "#" not in prefix:
+        # This is called for every sibling and child while looking for the end
+        # of a `# fmt: off` region, and most of them don't have any comments.
+        return False
+
     fmt_on = False
-    for comment in list_comments(container.prefix, is_endmarker=False):
+    for comment in list_comments(prefix, is_endmarker=False):
         if comment.value in FMT_ON:
             fmt_on = True
         elif comment.value in FMT_OFF:
@@ -399,6 +416,10 @@ def _contains_fmt_skip_comment(comment_line: str, mode: Mode) -> bool:
       # noqa:XXX # fmt:skip # a nice line  <-- multiple comments (Preview)
       # pylint:XXX; fmt:skip               <-- list of comments (; separated, Preview)
     """
+    if "fmt:" not in comment_line:
+        # Every spelling in FMT_SKIP contains this, and most comments don't.
+        return False
+
     semantic_comment_blocks = [
         comment_line,
         *[
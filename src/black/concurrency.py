@@ -12,7 +12,8 @@ import sys
 import traceback
 from collections.abc import Iterable
 from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
-from multiprocessing import Manager
+from dataclasses import replace
+from multiprocessing import Lock
 from pathlib import Path
 from typing import Any, Optional
 
@@ -39,6 +40,40 @@ def maybe_install_uvloop() -> None:
         pass
 
 
+# Options shared by all formatting tasks, set up in each worker by `_init_worker`
+# so that they don't need to be pickled along with every single file.
+_FAST = False
+_WRITE_BACK = WriteBack.NO
+_MODES: dict[str, Mode] = {}
+# Lock serializing diff output to stdout across workers.
+_OUTPUT_LOCK: Any = None
+
+
+def _init_worker(fast: bool, write_back: WriteBack, mode: Mode, lock: Any) -> None:
+    """Executor initializer storing the options shared by all formatting tasks."""
+    global _FAST, _WRITE_BACK, _MODES, _OUTPUT_LOCK
+    _FAST = fast
+    _WRITE_BACK = write_back
+    # Specialize `mode` for stubs and notebooks once up front instead of having
+    # format_file_in_place() rebuild it for every such file.
+    _MODES = {
+        "": mode,
+        ".pyi": replace(mode, is_pyi=True),
+        ".ipynb": replace(mode, is_ipynb=True),
+    }
+    _OUTPUT_LOCK = lock
+
+
+def _format_file_in_place(src: str) -> bool:
+    """Call :func:`format_file_in_place` with the options set up for the worker.
+
+    `src` is passed as a string since it's cheaper to pickle than a `Path`.
+    """
+    path = Path(src)
+    mode = _MODES.get(path.suffix, _MODES[""])
+    return format_file_in_place(path, _FAST, mode, _WRITE_BACK, _OUTPUT_LOCK)
+
+
 def cancel(tasks: Iterable["asyncio.Future[Any]"]) -> None:
     """asyncio signal handler that cancels all `tasks` and reports to stderr."""
     err("Aborted!")
@@ -46,26 +81,6 @@ def cancel(tasks: Iterable["asyncio.Future[Any]"]) -> None:
         task.cancel()
 
 
-def shutdown(loop: asyncio.AbstractEventLoop) -> None:
-    """Cancel all pending tasks on `loop`, wait for them, and close the loop."""
-    try:
-        # This part is borrowed from asyncio/runners.py in Python 3.7b2.
-        to_cancel = [task for task in asyncio.all_tasks(loop) if not task.done()]
-        if not to_cancel:
-            return
-
-        for task in to_cancel:
-            task.cancel()
-        loop.run_until_complete(asyncio.gather(*to_cancel, return_exceptions=True))
-    finally:
-        # `concurrent.futures.Future` objects cannot be cancelled once they
-        # are already running. There might be some when the `shutdown()` happened.
-        # Silence their logger's spew about the event loop being closed.
-        cf_logger = logging.getLogger("concurrent.futures")
-        cf_logger.setLevel(logging.CRITICAL)
-        loop.close()
-
-
 # diff-shades depends on being to monkeypatch this function to operate. I know it's
 # not ideal, but this shouldn't cause any issues ... hopefully. ~ichard26
 @mypyc_attr(patchable=True)
@@ -80,43 +95,72 @@ def reformat_many(
     """Reformat multiple files using a ProcessPoolExecutor."""
     maybe_install_uvloop()
 
-    executor: Executor
     if workers is None:
         workers = int(os.environ.get("BLACK_NUM_WORKERS", 0))
         workers = workers or os.cpu_count() or 1
     if sys.platform == "win32":
         # Work around https://bugs.python.org/issue26903
         workers = min(workers, 60)
-    try:
-        executor = ProcessPoolExecutor(max_workers=workers)
-    except (ImportError, NotImplementedError, OSError):
-        # we arrive here if the underlying system does not support multi-processing
-        # like in AWS Lambda or Termux, in which case we gracefully fallback to
-        # a ThreadPoolExecutor with just a single worker (more workers would not do us
-        # any good due to the Global Interpreter Lock)
-        executor = ThreadPoolExecutor(max_workers=1)
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(
+        # asyncio.run() cancels any leftover tasks and closes the loop for us,
+        # and picks up uvloop's event loop policy if it was installed above.
+        asyncio.run(
             schedule_formatting(
                 sources=sources,
                 fast=fast,
                 write_back=write_back,
                 mode=mode,
                 report=report,
-                loop=loop,
-                executor=executor,
+                workers=workers,
             )
         )
     finally:
-        try:
-            shutdown(loop)
-        finally:
-            asyncio.set_event_loop(None)
-        if executor is not None:
-            executor.shutdown()
+        # `concurrent.futures.Future` objects cannot be cancelled once they
+        # are already running. There might be some when the loop was closed.
+        # Silence their logger's spew about the event loop being closed.
+        cf_logger = logging.getLogger("concurrent.futures")
+        cf_logger.setLevel(logging.CRITICAL)
+
+
+def _create_executor(
+    workers: int, fast: bool, write_back: WriteBack, mode: Mode
+) -> Executor:
+    """Return an executor whose workers format files with the given options."""
+    lock = None
+    try:
+        if workers > 1 and write_back in (WriteBack.DIFF, WriteBack.COLOR_DIFF):
+            # For diff output, we need locks to ensure we don't interleave output
+            # from different processes. A plain multiprocessing lock is handed to
+            # the workers on startup, which is much cheaper than going through a
+            # Manager process for every acquire and release. A single worker
+            # can't interleave with anything, so it doesn't need one.
+            lock = Lock()
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(fast, write_back, mode, lock),
+        )
+    except (ImportError, NotImplementedError, OSError):
+        # we arrive here if the underlying system does not support multi-processing
+        # like in AWS Lambda or Termux, in which case we gracefully fallback to
+        # a ThreadPoolExecutor with just a single worker (more workers would not do us
+        # any good due to the Global Interpreter Lock)
+        return ThreadPoolExecutor(
+            max_workers=1,
+            initializer=_init_worker,
+            initargs=(fast, write_back, mode, None),
+        )
+
+
+def _source_size_key(src: Path) -> tuple[int, Path]:
+    """Sort key ordering `src` paths by descending file size, then by path."""
+    try:
+        size = src.stat().st_size
+    except OSError:
+        # Let the worker report the problem with this file.
+        size = 0
+    return -size, src
 
 
 async def schedule_formatting(
@@ -125,39 +169,51 @@ async def schedule_formatting(
     write_back: WriteBack,
     mode: Mode,
     report: "Report",
-    loop: asyncio.AbstractEventLoop,
-    executor: "Executor",
+    workers: int,
 ) -> None:
-    """Run formatting of `sources` in parallel using the provided `executor`.
-
-    (Use ProcessPoolExecutors for actual parallelism.)
+    """Run formatting of `sources` in parallel using up to `workers` processes.
 
-    `write_back`, `fast`, and `mode` options are passed to
-    :func:`format_file_in_place`.
+    The `fast`, `write_back`, and `mode` options are passed to
+    :func:`format_file_in_place` for each file.
     """
     cache = Cache.read(mode)
     if write_back not in (WriteBack.DIFF, WriteBack.COLOR_DIFF):
         sources, cached = cache.filtered_cached(sources)
-        for src in sorted(cached):
+        # Cached files are only listed in verbose mode, so don't bother sorting
+        # them for a consistent output order otherwise.
+        for src in sorted(cached) if report.verbose else cached:
             report.done(src, Changed.CACHED)
     if not sources:
         return
 
+    executor = _create_executor(workers, fast, write_back, mode)
+    try:
+        await _run_formatting(sources, write_back, report, cache, executor)
+    finally:
+        executor.shutdown()
+
+
+async def _run_formatting(
+    sources: set[Path],
+    write_back: WriteBack,
+    report: Report,
+    cache: Cache,
+    executor: Executor,
+) -> None:
+    """Format `sources` on `executor`, report results and update the `cache`.
+
+    The `executor` must have been created by :func:`_create_executor`.
+    """
+    loop = asyncio.get_running_loop()
     cancelled = []
     sources_to_cache = []
-    lock = None
-    if write_back in (WriteBack.DIFF, WriteBack.COLOR_DIFF):
-        # For diff output, we need locks to ensure we don't interleave output
-        # from different processes.
-        manager = Manager()
-        lock = manager.Lock()
     tasks = {
         asyncio.ensure_future(
-            loop.run_in_executor(
-                executor, format_file_in_place, src, fast, mode, write_back, lock
-            )
+            loop.run_in_executor(executor, _format_file_in_place, str(src))
         ): src
-        for src in sorted(sources)
+        # Submit the largest files first so that they don't end up extending
+        # the total run time by being picked up last.
+        for src in sorted(sources, key=_source_size_key)
     }
     pending = tasks.keys()
     try:
@@ -166,25 +222,29 @@ async def schedule_formatting(
     except NotImplementedError:
         # There are no good alternatives for these on Windows.
         pass
+    # Collect tasks as they complete instead of repeatedly waiting on the whole
+    # pending set, which is quadratic in the number of sources.
+    done: "asyncio.Queue[asyncio.Future[bool]]" = asyncio.Queue()
+    for task in tasks:
+        task.add_done_callback(done.put_nowait)
     while pending:
-        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-        for task in done:
-            src = tasks.pop(task)
-            if task.cancelled():
-                cancelled.append(task)
-            elif exc := task.exception():
-                if report.verbose:
-                    traceback.print_exception(type(exc), exc, exc.__traceback__)
-                report.failed(src, str(exc))
-            else:
-                changed = Changed.YES if task.result() else Changed.NO
-                # If the file was written back or was successfully checked as
-                # well-formatted, store this information in the cache.
-                if write_back is WriteBack.YES or (
-                    write_back is WriteBack.CHECK and changed is Changed.NO
-                ):
-                    sources_to_cache.append(src)
-                report.done(src, changed)
+        task = await done.get()
+        src = tasks.pop(task)
+        if task.cancelled():
+            cancelled.append(task)
+        elif exc := task.exception():
+            if report.verbose:
+                traceback.print_exception(type(exc), exc, exc.__traceback__)
+            report.failed(src, str(exc))
+        else:
+            changed = Changed.YES if task.result() else Changed.NO
+            # If the file was written back or was successfully checked as
+            # well-formatted, store this information in the cache.
+            if write_back is WriteBack.YES or (
+                write_back is WriteBack.CHECK and changed is Changed.NO
+            ):
+                sources_to_cache.append(src)
+            report.done(src, changed)
     if cancelled:
         await asyncio.gather(*cancelled, return_exceptions=True)
     if sources_to_cache:
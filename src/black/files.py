@@ -293,6 +293,8 @@ def _path_is_ignored(
     root_relative_path: str,
     root: Path,
     gitignore_dict: dict[Path, PathSpec],
+    *,
+    is_dir: bool,
 ) -> bool:
     path = root / root_relative_path
     # Note that this logic is sensitive to the ordering of gitignore_dict. Callers must
@@ -300,7 +302,7 @@ def _path_is_ignored(
     for gitignore_path, pattern in gitignore_dict.items():
         try:
             relative_path = path.relative_to(gitignore_path).as_posix()
-            if path.is_dir():
+            if is_dir:
                 relative_path = relative_path + "/"
         except ValueError:
             break
@@ -343,17 +345,19 @@ def gen_python_files(
     for child in paths:
         assert child.is_absolute()
         root_relative_path = child.relative_to(root).as_posix()
+        # Only stat the child once, this runs for every entry in the tree.
+        is_dir = child.is_dir()
 
         # First ignore files matching .gitignore, if passed
         if gitignore_dict and _path_is_ignored(
-            root_relative_path, root, gitignore_dict
+            root_relative_path, root, gitignore_dict, is_dir=is_dir
         ):
             report.path_ignored(child, "matches a .gitignore file content")
             continue
 
         # Then ignore with `--exclude` `--extend-exclude` and `--force-exclude` options.
         root_relative_path = "/" + root_relative_path
-        if child.is_dir():
+        if is_dir:
             root_relative_path += "/"
 
         if path_is_excluded(root_relative_path, exclude):
@@ -370,17 +374,29 @@ def gen_python_files(
             report.path_ignored(child, "matches the --force-exclude regular expression")
             continue
 
-        if resolves_outside_root_or_cannot_stat(child, root, report):
+        # Entries of a directory we have already walked into can only lead outside
+        # of `root` through a link, so don't pay for resolving every other path.
+        # Junctions aren't reported as symlinks on Windows, so always check there.
+        if (
+            sys.platform == "win32" or child.is_symlink()
+        ) and resolves_outside_root_or_cannot_stat(child, root, report):
             continue
 
-        if child.is_dir():
+        if is_dir:
             # If gitignore is None, gitignore usage is disabled, while a Falsey
             # gitignore is when the directory doesn't have a .gitignore file.
             if gitignore_dict is not None:
-                new_gitignore_dict = {
-                    **gitignore_dict,
-                    root / child: get_gitignore(child),
-                }
+                # Directories without a .gitignore can't ignore anything, so leave
+                # them out instead of matching every path below them against an
+                # empty spec.
+                child_gitignore = get_gitignore(child)
+                if child_gitignore:
+                    new_gitignore_dict = {
+                        **gitignore_dict,
+                        root / child: child_gitignore,
+                    }
+                else:
+                    new_gitignore_dict = gitignore_dict
             else:
                 new_gitignore_dict = None
             yield from gen_python_files(
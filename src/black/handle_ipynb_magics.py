@@ -25,6 +25,10 @@ TRANSFORMED_MAGICS = frozenset((
     "get_ipython().getoutput",
     "get_ipython().run_line_magic",
 ))
+# All of the above in one pattern, so that cells are only scanned once.
+TRANSFORMED_MAGICS_RE = re.compile(
+    "|".join(re.escape(magic) for magic in sorted(TRANSFORMED_MAGICS))
+)
 TOKENS_TO_IGNORE = frozenset((
     "ENDMARKER",
     "NL",
@@ -83,7 +87,7 @@ def validate_cell(src: str, mode: Mode) -> None:
     Due to the impossibility of safely roundtripping in such situations, cells
     containing transformed magics will be ignored.
     """
-    if any(transformed_magic in src for transformed_magic in TRANSFORMED_MAGICS):
+    if TRANSFORMED_MAGICS_RE.search(src):
         raise NothingChanged
 
     line = _get_code_start(src)
@@ -600,19 +600,26 @@ def _hugging_power_ops_line_to_string(
 
 
 def transform_line(
-    line: Line, mode: Mode, features: Collection[Feature] = ()
+    line: Line,
+    mode: Mode,
+    features: Collection[Feature] = (),
+    *,
+    line_str: str = "",
 ) -> Iterator[Line]:
     """Transform a `line`, potentially splitting it into many lines.
 
     They should fit in the allotted `line_length` but might not be able to.
 
     `features` are syntactical features that may be used in the output.
+
+    Uses the provided `line_str` rendering, if any, otherwise computes a new one.
     """
     if line.is_comment:
         yield line
         return
 
-    line_str = line_to_string(line)
+    if not line_str:
+        line_str = line_to_string(line)
 
     # We need the line string when power operators are hugging to determine if we should
     # split the line. Default to line_str, if no power operator are present on the line.
@@ -1781,10 +1788,18 @@ def run_transformer(
         line_str = line_to_string(line)
     result: list[Line] = []
     for transformed_line in transform(line, features, mode):
-        if str(transformed_line).strip("\n") == line_str:
+        transformed_line_str = line_to_string(transformed_line)
+        if transformed_line_str == line_str:
             raise CannotTransform("Line transformer returned an unchanged result")
 
-        result.extend(transform_line(transformed_line, mode=mode, features=features))
+        result.extend(
+            transform_line(
+                transformed_line,
+                mode=mode,
+                features=features,
+                line_str=transformed_line_str,
+            )
+        )
 
     features_set = set(features)
     if (
@@ -525,10 +525,16 @@ class LinesBlock:
     after: int = 0
     form_feed: bool = False
 
-    def all_lines(self) -> list[str]:
-        empty_line = str(Line(mode=self.mode))
+    def all_lines(self, empty_line: Optional[str] = None) -> list[str]:
+        """Return the rendered lines of this block, including empty lines.
+
+        Pass the rendered `empty_line` when calling this for many blocks to avoid
+        creating a new `Line` for each of them.
+        """
+        if empty_line is None:
+            empty_line = str(Line(mode=self.mode))
         prefix = make_simple_prefix(self.before, self.form_feed, empty_line)
-        return [prefix] + self.content_lines + [empty_line * self.after]
+        return [prefix, *self.content_lines, empty_line * self.after]
 
 
 @dataclass
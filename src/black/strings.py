@@ -24,6 +24,14 @@ UNICODE_ESCAPE_RE: Final = re.compile(
     r")",
     re.VERBOSE,
 )
+FSTRING_EXPR_RE: Final = re.compile(
+    r"""
+    (?:(?<!\{)|^)\{  # start of the string or a non-{ followed by a single {
+        ([^{].*?)  # contents of the brackets except if begins with {{
+    \}(?:(?!\})|$)  # A } followed by end of the string or a non-}
+    """,
+    re.VERBOSE,
+)
 
 
 def sub_twice(regex: Pattern[str], replacement: str, original: str) -> str:
@@ -32,7 +40,20 @@ def sub_twice(regex: Pattern[str], replacement: str, original: str) -> str:
     This is used by string normalization to perform replaces on
     overlapping matches.
     """
-    return regex.sub(replacement, regex.sub(replacement, original))
+    once = regex.sub(replacement, original)
+    if once == original:
+        # The first pass changed nothing, so the second one would not either.
+        return once
+
+    return regex.sub(replacement, once)
+
+
+def _prefix_length(string: str) -> int:
+    """Return the number of string prefix characters at the start of `string`."""
+    prefix_idx = 0
+    while prefix_idx < len(string) and string[prefix_idx] in STRING_PREFIX_CHARS:
+        prefix_idx += 1
+    return prefix_idx
 
 
 def has_triple_quotes(string: str) -> bool:
@@ -40,8 +61,9 @@ def has_triple_quotes(string: str) -> bool:
     Returns:
         True iff @string starts with three quotation characters.
     """
-    raw_string = string.lstrip(STRING_PREFIX_CHARS)
-    return raw_string[:3] in {'"""', "'''"}
+    # Look at the quotes in place, lstrip() would copy the whole string.
+    prefix_idx = _prefix_length(string)
+    return string[prefix_idx : prefix_idx + 3] in {'"""', "'''"}
 
 
 def lines_with_leading_tabs_expanded(s: str) -> list[str]:
@@ -49,6 +71,13 @@ def lines_with_leading_tabs_expanded(s: str) -> list[str]:
     Splits string into lines and expands only leading tabs (following the normal
     Python rules)
     """
+    if "\t" not in s:
+        # Nothing to expand, which is the case for the vast majority of docstrings.
+        lines = s.splitlines()
+        if s.endswith("\n"):
+            lines.append("")
+        return lines
+
     lines = []
     for line in s.splitlines():
         stripped_line = line.lstrip()
@@ -97,13 +126,7 @@ def get_string_prefix(string: str) -> str:
     """
     assert_is_leaf_string(string)
 
-    prefix = ""
-    prefix_idx = 0
-    while string[prefix_idx] in STRING_PREFIX_CHARS:
-        prefix += string[prefix_idx]
-        prefix_idx += 1
-
-    return prefix
+    return string[: _prefix_length(string)]
 
 
 def assert_is_leaf_string(string: str) -> None:
@@ -122,6 +145,16 @@ def assert_is_leaf_string(string: str) -> None:
         AssertionError(...) if the pre-conditions listed above are not
         satisfied.
     """
+    # Fast path: walk past the prefix and check the quotes on both ends. This
+    # is equivalent to the checks below, which only run to report what's wrong.
+    prefix_idx = _prefix_length(string)
+    if (
+        prefix_idx < len(string) - 1
+        and string[prefix_idx] in ("'", '"')
+        and string[-1] in ("'", '"')
+    ):
+        return
+
     dquote_idx = string.find('"')
     squote_idx = string.find("'")
     if -1 in [dquote_idx, squote_idx]:
@@ -141,17 +174,21 @@ def assert_is_leaf_string(string: str) -> None:
     ), f"{set(string[:quote_idx])} is NOT a subset of {set(STRING_PREFIX_CHARS)}."
 
 
+# Lowercase "F" and "B" and drop the redundant "u"/"U" prefix.
+_PREFIX_TRANSLATION: Final = str.maketrans({"F": "f", "B": "b", "U": None, "u": None})
+
+
 def normalize_string_prefix(s: str) -> str:
     """Make all string prefixes lowercase."""
+    if s[:1] in ('"', "'"):
+        return s  # No prefix, the most common case by far
+    if s[:1] in ("r", "R", "f", "b") and s[1:2] in ('"', "'"):
+        return s  # A single prefix character that's already normalized
+
     match = STRING_PREFIX_RE.match(s)
     assert match is not None, f"failed to match string {s!r}"
     orig_prefix = match.group(1)
-    new_prefix = (
-        orig_prefix.replace("F", "f")
-        .replace("B", "b")
-        .replace("U", "")
-        .replace("u", "")
-    )
+    new_prefix = orig_prefix.translate(_PREFIX_TRANSLATION)
 
     # Python syntax guarantees max 2 prefixes and that one of them is "r"
     if len(new_prefix) == 2 and "r" != new_prefix[0].lower():
@@ -159,27 +196,36 @@ def normalize_string_prefix(s: str) -> str:
     return f"{new_prefix}{match.group(2)}"
 
 
-# Re(gex) does actually cache patterns internally but this still improves
-# performance on a long list literal of strings by 5-9% since lru_cache's
-# caching overhead is much lower.
-@lru_cache(maxsize=64)
-def _cached_compile(pattern: str) -> Pattern[str]:
-    return re.compile(pattern)
+# Patterns used to add and remove escapes around each kind of quote. There are
+# only four kinds, so compile them all up front rather than building and looking
+# up the pattern source on every call.
+_QUOTES: Final = ("'", '"', "'''", '"""')
+_UNESCAPED_QUOTE_RE: Final = {
+    quote: re.compile(rf"(([^\\]|^)(\\\\)*){quote}") for quote in _QUOTES
+}
+_ESCAPED_QUOTE_RE: Final = {
+    quote: re.compile(rf"([^\\]|^)\\((?:\\\\)*){quote}") for quote in _QUOTES
+}
 
 
+# The same literals show up over and over again across the files formatted by a
+# worker, and skipping the regex substitutions for them makes up for hashing the
+# literal on cache misses.
+@lru_cache(maxsize=4096)
 def normalize_string_quotes(s: str) -> str:
     """Prefer double quotes but only if it doesn't cause more escaping.
 
     Adds or removes backslashes as appropriate.
     """
-    value = s.lstrip(STRING_PREFIX_CHARS)
-    if value[:3] == '"""':
+    # Look at the quotes in place, lstrip() would copy the whole string.
+    quote_idx = _prefix_length(s)
+    if s.startswith('"""', quote_idx):
         return s
 
-    elif value[:3] == "'''":
+    elif s.startswith("'''", quote_idx):
         orig_quote = "'''"
         new_quote = '"""'
-    elif value[0] == '"':
+    elif s.startswith('"', quote_idx):
         orig_quote = '"'
         new_quote = "'"
     else:
@@ -190,11 +236,22 @@ def normalize_string_quotes(s: str) -> str:
         return s  # There's an internal error
 
     prefix = s[:first_quote_pos]
-    unescaped_new_quote = _cached_compile(rf"(([^\\]|^)(\\\\)*){new_quote}")
-    escaped_new_quote = _cached_compile(rf"([^\\]|^)\\((?:\\\\)*){new_quote}")
-    escaped_orig_quote = _cached_compile(rf"([^\\]|^)\\((?:\\\\)*){orig_quote}")
+    unescaped_new_quote = _UNESCAPED_QUOTE_RE[new_quote]
+    escaped_new_quote = _ESCAPED_QUOTE_RE[new_quote]
+    escaped_orig_quote = _ESCAPED_QUOTE_RE[orig_quote]
     body = s[first_quote_pos + len(orig_quote) : -len(orig_quote)]
-    if "r" in prefix.casefold():
+    if "\\" not in body:
+        # Without any escapes in the body, the outcome of the checks below is
+        # known up front, which covers most strings.
+        if orig_quote == '"':
+            return s  # Prefer double quotes
+
+        if '"' not in body:
+            return f"{prefix}{new_quote}{body}{new_quote}"
+
+    # The prefix is plain ASCII, so lower() is enough; only do it once.
+    lower_prefix = prefix.lower()
+    if "r" in lower_prefix:
         if unescaped_new_quote.search(body):
             # There's at least one unescaped new_quote in this raw string
             # so converting is impossible
@@ -212,18 +269,9 @@ def normalize_string_quotes(s: str) -> str:
         new_body = sub_twice(escaped_orig_quote, rf"\1\2{orig_quote}", new_body)
         new_body = sub_twice(unescaped_new_quote, rf"\1\\{new_quote}", new_body)
 
-    if "f" in prefix.casefold():
-        matches = re.findall(
-            r"""
-            (?:(?<!\{)|^)\{  # start of the string or a non-{ followed by a single {
-                ([^{].*?)  # contents of the brackets except if begins with {{
-            \}(?:(?!\})|$)  # A } followed by end of the string or a non-}
-            """,
-            new_body,
-            re.VERBOSE,
-        )
-        for m in matches:
-            if "\\" in str(m):
+    if "f" in lower_prefix and "\\" in new_body:
+        for match in FSTRING_EXPR_RE.finditer(new_body):
+            if "\\" in match.group(1):
                 # Do not introduce backslashes in interpolated expressions
                 return s
 
@@ -231,7 +279,11 @@ def normalize_string_quotes(s: str) -> str:
         # edge case:
         new_body = new_body[:-1] + '\\"'
     orig_escape_count = body.count("\\")
-    new_escape_count = new_body.count("\\")
+    if new_body == body:
+        # Nothing was changed (as usual for raw strings), don't count twice.
+        new_escape_count = orig_escape_count
+    else:
+        new_escape_count = new_body.count("\\")
     if new_escape_count > orig_escape_count:
         return s  # Do not introduce more escaping
 
@@ -260,9 +312,9 @@ def normalize_fstring_quotes(
     else:
         new_quote = '"'
 
-    unescaped_new_quote = _cached_compile(rf"(([^\\]|^)(\\\\)*){new_quote}")
-    escaped_new_quote = _cached_compile(rf"([^\\]|^)\\((?:\\\\)*){new_quote}")
-    escaped_orig_quote = _cached_compile(rf"([^\\]|^)\\((?:\\\\)*){quote}")
+    unescaped_new_quote = _UNESCAPED_QUOTE_RE[new_quote]
+    escaped_new_quote = _ESCAPED_QUOTE_RE[new_quote]
+    escaped_orig_quote = _ESCAPED_QUOTE_RE[quote]
     if is_raw_fstring:
         for middle in middles:
             if unescaped_new_quote.search(middle.value):
@@ -726,7 +726,7 @@ class StringMerger(StringTransformer, CustomSplitMapMixin):
             # with 'f'...
             if "f" in prefix and "f" not in next_prefix:
                 # Then we must escape any braces contained in this substring.
-                SS = re.sub(r"(\{|\})", r"\1\1", SS)
+                SS = SS.replace("{", "{{").replace("}", "}}")
 
             NSS = make_naked(SS, next_prefix)
 
@@ -1313,6 +1313,12 @@ class BaseStringSplitter(StringTransformer):
         return None
 
 
+# Characters that `iter_fexpr_spans` needs to look at, outside of and inside of
+# expressions respectively. Everything in between is skipped by the regex engine.
+_FSTRING_BRACES_RE: Final = re.compile(r"[{}]")
+_FSTRING_EXPR_DELIMITERS_RE: Final = re.compile(r"[{}'\"]")
+
+
 def iter_fexpr_spans(s: str) -> Iterator[tuple[int, int]]:
     """
     Yields spans corresponding to expressions in a given f-string.
@@ -1322,7 +1328,15 @@ def iter_fexpr_spans(s: str) -> Iterator[tuple[int, int]]:
     """
     stack: list[int] = []  # our curly paren stack
     i = 0
-    while i < len(s):
+    while True:
+        # jump to the next character we care about; quotes only matter within
+        # expressions
+        pattern = _FSTRING_EXPR_DELIMITERS_RE if stack else _FSTRING_BRACES_RE
+        match = pattern.search(s, i)
+        if match is None:
+            return
+        i = match.start()
+
         if s[i] == "{":
             # if we're in a string part of the f-string, ignore escaped curly braces
             if not stack and i + 1 < len(s) and s[i + 1] == "{":
@@ -1343,21 +1357,16 @@ def iter_fexpr_spans(s: str) -> Iterator[tuple[int, int]]:
             i += 1
             continue
 
-        # if we're in an expression part of the f-string, fast-forward through strings
+        # we're in an expression part of the f-string, fast-forward through strings
         # note that backslashes are not legal in the expression portion of f-strings
-        if stack:
-            delim = None
-            if s[i : i + 3] in ("'''", '"""'):
-                delim = s[i : i + 3]
-            elif s[i] in ("'", '"'):
-                delim = s[i]
-            if delim:
-                i += len(delim)
-                while i < len(s) and s[i : i + len(delim)] != delim:
-                    i += 1
-                i += len(delim)
-                continue
-        i += 1
+        if s[i : i + 3] in ("'''", '"""'):
+            delim = s[i : i + 3]
+        else:
+            delim = s[i]
+        end = s.find(delim, i + len(delim))
+        if end == -1:
+            return
+        i = end + len(delim)
 
 
 def fstring_contains_expr(s: str) -> bool:
@@ -1875,8 +1884,7 @@ class StringSplitter(BaseStringSplitter, CustomSplitMapMixin):
             new_prefix = prefix.replace("f", "")
 
             temp = string[len(prefix) :]
-            temp = re.sub(r"\{\{", "{", temp)
-            temp = re.sub(r"\}\}", "}", temp)
+            temp = temp.replace("{{", "{").replace("}}", "}")
             new_string = temp
 
             return f"{new_prefix}{new_string}"
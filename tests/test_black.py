@@ -932,6 +932,39 @@ class BlackTestCase(BlackBaseTestCase):
             DebugVisitor.show(node)
             raise
 
+    def test_get_features_used_detects_every_node_type(self) -> None:
+        # get_features_used() skips nodes whose type isn't in _FEATURE_NODE_TYPES,
+        # so a check whose node type is missing from that set would silently never
+        # fire. Exercise every node type each check looks at.
+        for src, feature in [
+            ("f'{x}'\n", Feature.F_STRINGS),
+            ("f'{x=}'\n", Feature.DEBUG_F_STRINGS),
+            ("1_000\n", Feature.NUMERIC_UNDERSCORES),
+            ("def f(a, /): ...\n", Feature.POS_ONLY_ARGUMENTS),
+            ("lambda a, /: ...\n", Feature.POS_ONLY_ARGUMENTS),
+            ("(x := 1)\n", Feature.ASSIGNMENT_EXPRESSIONS),
+            ("@a[0]\ndef f(): ...\n", Feature.RELAXED_DECORATORS),
+            ("def f(*a,): ...\n", Feature.TRAILING_COMMA_IN_DEF),
+            ("f(*a,)\n", Feature.TRAILING_COMMA_IN_CALL),
+            ("def f(): return *a, b\n", Feature.UNPACKING_ON_FLOW),
+            ("def f(): yield *a, b\n", Feature.UNPACKING_ON_FLOW),
+            ("x: Tuple[int, ...] = *a, b\n", Feature.ANN_ASSIGN_EXTENDED_RHS),
+            ("with (a as b): pass\n", Feature.PARENTHESIZED_CONTEXT_MANAGERS),
+            ("match x:\n    case 1: pass\n", Feature.PATTERN_MATCHING),
+            ("try: pass\nexcept* E: pass\n", Feature.EXCEPT_STAR),
+            ("a[*b]\n", Feature.VARIADIC_GENERICS),
+            ("a[x, *y] = t\n", Feature.VARIADIC_GENERICS),
+            ("def f(*args: *Ts): ...\n", Feature.VARIADIC_GENERICS),
+            ("type A = int\n", Feature.TYPE_PARAMS),
+            ("def f[T](): ...\n", Feature.TYPE_PARAMS),
+            ("def f[T = int](): ...\n", Feature.TYPE_PARAM_DEFAULTS),
+            ("def f[*Ts = *tuple[int]](): ...\n", Feature.TYPE_PARAM_DEFAULTS),
+            ("def f[**P = [int]](): ...\n", Feature.TYPE_PARAM_DEFAULTS),
+        ]:
+            with self.subTest(src=src, feature=feature):
+                node = black.lib2to3_parse(src)
+                self.assertIn(feature, black.get_features_used(node))
+
     def test_get_features_used_for_future_flags(self) -> None:
         for src, features in [
             ("from __future__ import annotations", {Feature.FUTURE_ANNOTATIONS}),
@@ -1035,6 +1068,18 @@ class BlackTestCase(BlackBaseTestCase):
         actual = black.format_file_contents(just_whitespace_crlf, mode=mode, fast=False)
         self.assertEqual("\r\n", actual)
 
+    @pytest.mark.incompatible_with_mypyc
+    def test_format_file_contents_skips_known_stable_check(self) -> None:
+        with patch(
+            "black._format_str_once", wraps=black._format_str_once
+        ) as format_once:
+            actual = black.format_file_contents(
+                "j = [1,2,3]", mode=DEFAULT_MODE, fast=False
+            )
+        self.assertEqual("j = [1, 2, 3]\n", actual)
+        # The second pass already proved the result stable.
+        self.assertEqual(format_once.call_count, 2)
+
     def test_endmarker(self) -> None:
         n = black.lib2to3_parse("\n")
         self.assertEqual(n.type, black.syms.file_input)
@@ -1097,6 +1142,27 @@ class BlackTestCase(BlackBaseTestCase):
                 f.write_text('print("hello")\n', encoding="utf-8")
             self.invokeBlack([str(workspace)])
 
+    def test_schedule_formatting_sets_up_its_own_workers(self) -> None:
+        from black.concurrency import schedule_formatting
+
+        with cache_dir() as workspace:
+            src = (workspace / "one.py").resolve()
+            src.write_text("print('hello')", encoding="utf-8")
+            report = black.Report()
+            asyncio.run(
+                schedule_formatting(
+                    sources={src},
+                    fast=False,
+                    write_back=black.WriteBack.YES,
+                    mode=DEFAULT_MODE,
+                    report=report,
+                    workers=1,
+                )
+            )
+            self.assertEqual(report.change_count, 1)
+            self.assertEqual(report.failure_count, 0)
+            self.assertEqual(src.read_text(encoding="utf-8"), 'print("hello")\n')
+
     @event_loop()
     def test_check_diff_use_together(self) -> None:
         with cache_dir():
@@ -2190,16 +2256,24 @@ class TestCaching:
             for tag in range(0, 4):
                 src = (workspace / f"test{tag}.py").resolve()
                 src.write_text("print('hello')", encoding="utf-8")
-            with patch(
-                "black.concurrency.Manager", wraps=multiprocessing.Manager
-            ) as mgr:
-                cmd = ["--diff", str(workspace)]
+            with patch("black.concurrency.Lock", wraps=multiprocessing.Lock) as lock:
+                cmd = ["--diff", "--workers=2", str(workspace)]
                 if color:
                     cmd.append("--color")
                 invokeBlack(cmd, exit_code=0)
                 # this isn't quite doing what we want, but if it _isn't_
                 # called then we cannot be using the lock it provides
-                mgr.assert_called()
+                lock.assert_called()
+
+    @event_loop()
+    def test_no_output_locking_with_single_worker(self) -> None:
+        with cache_dir() as workspace:
+            for tag in range(0, 2):
+                src = (workspace / f"test{tag}.py").resolve()
+                src.write_text("print('hello')", encoding="utf-8")
+            with patch("black.concurrency.Lock", wraps=multiprocessing.Lock) as lock:
+                invokeBlack(["--diff", "--workers=1", str(workspace)], exit_code=0)
+                lock.assert_not_called()
 
     def test_no_cache_when_stdin(self) -> None:
         mode = DEFAULT_MODE
@@ -2253,6 +2327,19 @@ class TestCaching:
             assert todo == {uncached, cached_but_changed}
             assert done == {cached}
 
+    @pytest.mark.incompatible_with_mypyc
+    def test_filter_cached_empty_cache(self) -> None:
+        with TemporaryDirectory() as workspace:
+            path = Path(workspace)
+            src = (path / "test.py").resolve()
+            src.touch()
+            cache = black.Cache(DEFAULT_MODE, get_cache_file(DEFAULT_MODE))
+            with patch.object(black.Cache, "is_changed") as is_changed:
+                todo, done = cache.filtered_cached([src])
+            is_changed.assert_not_called()
+            assert todo == {src}
+            assert done == set()
+
     def test_filter_cached_hash(self) -> None:
         with TemporaryDirectory() as workspace:
             path = Path(workspace)